@@ -1,40 +1,79 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import asyncio
+import sys
+import httpx
+import lxml.html
+import orjson
 
 OUTPUT_FILE = "knowledge.json"
 
-def scrape_page(url="https://www.occamsadvisory.com/"):
-    html = requests.get(url, timeout=10).text
-    soup = BeautifulSoup(html, "html.parser")
+URLS = [
+    "https://www.occamsadvisory.com/",
+]
+
+# Pages are fetched concurrently over one keep-alive pool
+LIMITS = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+
+async def scrape_page(client: httpx.AsyncClient, url="https://www.occamsadvisory.com/"):
+    response = await client.get(url)
+    response.raise_for_status()
+    html = response.content
+    # Parsing one page overlaps with the other requests still in flight
+    tree = lxml.html.fromstring(html)
     return {
         "url": url,
-        "title": soup.title.text.strip(),
-        "content": " ".join(p.get_text(" ", strip=True) for p in soup.find_all("p")),
+        "title": (tree.findtext(".//title") or "").strip(),
+        # Only the text nodes under <p> are needed
+        "content": " ".join(t.strip() for t in tree.xpath("//p//text()") if t.strip()),
     }
 
 
-import re
-
 def clean_text(text: str) -> str:
     if not text:
         return ""
 
-    # Replace multiple whitespace (space, \n, \t) with single space
-    text = re.sub(r"\s+", " ", text)
+    # Collapse whitespace runs (space, \n, \t) into single spaces; split()
+    # with no args also drops leading/trailing whitespace
+    return " ".join(text.split())
 
-    return text.strip()
 
+async def scrape_all(urls=URLS, transport=None):
+    async with httpx.AsyncClient(
+        limits=LIMITS, timeout=10, follow_redirects=True, transport=transport
+    ) as client:
+        results = await asyncio.gather(
+            *[scrape_page(client, url) for url in urls], return_exceptions=True
+        )
 
-if __name__ == "__main__":
+    pages = []
+    for url, result in zip(urls, results):
+        # One unreachable page shouldn't sink the whole knowledge base
+        if isinstance(result, BaseException):
+            print(f"WARNING: failed to scrape {url}: {result}")
+            continue
+        pages.append(result)
+    return pages
+
+
+def main(urls=URLS, transport=None) -> int:
     print("Starting ingestion pipeline...")
-    data = scrape_page()
+    data = asyncio.run(scrape_all(urls, transport))
+
+    # Keep the existing knowledge base rather than replace it with nothing
+    if not data:
+        print(f"ERROR: no pages scraped. {OUTPUT_FILE} left untouched.")
+        return 1
 
-    data["content"] = clean_text(data["content"])
+    for page in data:
+        page["content"] = clean_text(page["content"])
     # Save to local file
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 
     print(f"Successfully scraped {len(data)} pages.")
     print(f"Knowledge base saved to {OUTPUT_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
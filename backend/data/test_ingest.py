@@ -0,0 +1,36 @@
+import httpx
+import orjson
+import ingest
+
+PAGE = b"<html><head><title> Occams </title></head><body><p>We handle\n <b>taxes</b>.</p></body></html>"
+
+def make_transport(failing):
+    def handler(request):
+        if request.url.host in failing:
+            return httpx.Response(500)
+        return httpx.Response(200, content=PAGE)
+    return httpx.MockTransport(handler)
+
+# --- TEST 1: PARTIAL FAILURE (Good pages are still saved) ---
+def test_partial_failure(tmp_path, monkeypatch):
+    out = tmp_path / "knowledge.json"
+    monkeypatch.setattr(ingest, "OUTPUT_FILE", str(out))
+
+    code = ingest.main(["https://ok.test/", "https://down.test/"], make_transport({"down.test"}))
+
+    assert code == 0
+    pages = orjson.loads(out.read_bytes())
+    assert [p["url"] for p in pages] == ["https://ok.test/"]
+    assert pages[0]["title"] == "Occams"
+    assert pages[0]["content"] == "We handle taxes ."
+
+# --- TEST 2: TOTAL FAILURE (Existing knowledge base is kept) ---
+def test_total_failure_keeps_existing_kb(tmp_path, monkeypatch):
+    out = tmp_path / "knowledge.json"
+    out.write_bytes(b'{"content": "previous"}')
+    monkeypatch.setattr(ingest, "OUTPUT_FILE", str(out))
+
+    code = ingest.main(["https://down.test/"], make_transport({"down.test"}))
+
+    assert code == 1
+    assert out.read_bytes() == b'{"content": "previous"}'
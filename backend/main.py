@@ -1,37 +1,199 @@
-import json
+import asyncio
+import hashlib
+import math
 import re
 import os
+import numpy as np
+import orjson
+from array import array
+from collections import Counter, OrderedDict
 from typing import Optional, List, Dict
 from fastapi import FastAPI, HTTPException, Body
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
+from scipy.sparse import csr_matrix
+
+# Load .env once at startup (not on every request)
+load_dotenv()
+API_KEY = os.getenv("OPENAI_API_KEY")
+
+# LLM client is created once and shared across requests, so its
+# keep-alive pool reuses TLS connections instead of re-handshaking
+CLIENT = None
+if API_KEY:
+    try:
+        import httpx
+        from openai import AsyncOpenAI
+        CLIENT = AsyncOpenAI(
+            api_key=API_KEY,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                timeout=5.0,  # Fail fast for offline demo
+            ),
+        )
+    except ImportError:
+        print("WARNING: openai package not installed. Running in offline mode.")
 
 # Initialize App
 app = FastAPI(title="Occams AI Assistant")
 
-# Enable CORS for the React frontend
+# Enable CORS for the React frontend only
+FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[FRONTEND_ORIGIN],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["POST", "GET"],
+    allow_headers=["content-type"],
+    max_age=86400,  # Let browsers cache the preflight for a day
 )
 
-# --- IN-MEMORY DATABASE (Minimal Stack) ---
-# In a real production app, use Redis or SQLite.
+# --- SESSION STORE (Minimal Stack) ---
+# Redis when REDIS_URL is set (shared across workers, bounded by TTL),
+# otherwise an in-memory dict for local dev.
 # Structure: { "session_id": { "step": "name", "data": {...}, "history": [] } }
-sessions: Dict[str, Dict] = {}
+SESSION_TTL = 3600  # Seconds of inactivity before a Redis session expires
+
+class SessionStore:
+    """In-process session store. Lost on restart, single worker only."""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict] = {}
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        return self._sessions.get(session_id)
+
+    async def save(self, session_id: str, session: Dict):
+        self._sessions[session_id] = session
+
+class RedisSessionStore(SessionStore):
+    """
+    Sessions as Redis hashes under `sess:<id>`.
+    Every read and write pushes the expiry back to SESSION_TTL, so any chat
+    turn (not just onboarding ones) keeps an active session alive.
+    """
+
+    def __init__(self, url: str, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        key = f"sess:{session_id}"
+        pipe = self._redis.pipeline()
+        pipe.hgetall(key)
+        pipe.expire(key, SESSION_TTL)
+        raw, _ = await pipe.execute()
+        if not raw:
+            return None
+        return {
+            "step": raw["step"],
+            "data": orjson.loads(raw["data"]),
+            "history": orjson.loads(raw["history"]),
+        }
+
+    async def save(self, session_id: str, session: Dict):
+        key = f"sess:{session_id}"
+        pipe = self._redis.pipeline()
+        pipe.hset(key, mapping={
+            "step": session["step"],
+            "data": orjson.dumps(session["data"]),
+            "history": orjson.dumps(session["history"]),
+        })
+        pipe.expire(key, SESSION_TTL)
+        await pipe.execute()
+
+REDIS_URL = os.getenv("REDIS_URL")
+sessions: SessionStore = RedisSessionStore(REDIS_URL) if REDIS_URL else SessionStore()
 
 # Load Knowledge Base (Offline Brain)
 try:
-    with open("knowledge.json", "r", encoding="utf-8") as f:
-        KNOWLEDGE_BASE = json.load(f)
+    with open("knowledge.json", "rb") as f:
+        KNOWLEDGE_BASE = orjson.loads(f.read())
 except FileNotFoundError:
     print("WARNING: knowledge.json not found. Run ingest.py first.")
     KNOWLEDGE_BASE = []
 
+# Handle both single object and array formats once, at load
+_KB_ITEMS: List[Dict] = KNOWLEDGE_BASE if isinstance(KNOWLEDGE_BASE, list) else [KNOWLEDGE_BASE]
+
+# BM25 Index over KB chunks (built once at startup)
+BM25_K1 = 1.2
+BM25_B = 0.75
+CHUNK_SIZE = 1000  # Max characters per indexed chunk
+
+VOCAB: Dict[str, int] = {}  # term -> column in DOC_TERM
+DOC_TERM = csr_matrix((0, 0))  # (n_chunks, |VOCAB|) sparse BM25 weights
+DOC_CONTENTS: List[str] = []  # doc_id -> chunk text
+
+def _chunk_text(text: str, size: int = CHUNK_SIZE) -> List[str]:
+    """
+    Split text into word-aligned chunks of at most `size` characters.
+    A single word longer than `size` is hard-split so no chunk exceeds it.
+    """
+    chunks, current, length = [], [], 0
+    words = (
+        piece
+        for token in text.split()
+        for piece in (token[i:i + size] for i in range(0, len(token), size))
+    )
+    for word in words:
+        if current and length + 1 + len(word) > size:
+            chunks.append(" ".join(current))
+            current, length = [], 0
+        length += len(word) + (1 if current else 0)
+        current.append(word)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+# Shared by the index and the query side so both split text identically
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOP = frozenset({"the", "a", "is", "of", "to", "and", "what", "do", "you"})
+
+def _tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+def _build_index():
+    global DOC_TERM
+
+    # Each chunk is lowercased and tokenized exactly once, here
+    term_freqs: Dict[str, List[tuple]] = {}
+    doc_lens: List[int] = []
+    for item in _KB_ITEMS:
+        for chunk in _chunk_text(item.get("content", "")):
+            doc_id = len(DOC_CONTENTS)
+            tokens = _tokenize(chunk)
+            DOC_CONTENTS.append(chunk)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_freqs.setdefault(term, []).append((doc_id, tf))
+
+    # The KB is static, so each (term, doc) BM25 contribution is computed
+    # up front and a query is a single sparse mat-vec over those weights.
+    n_docs = len(doc_lens)
+    avg_doc_len = sum(doc_lens) / n_docs if n_docs else 0.0
+    rows, cols, weights = array("i"), array("i"), array("d")
+    for term, postings in term_freqs.items():
+        col = VOCAB[term] = len(VOCAB)
+        df = len(postings)
+        idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1)
+        for doc_id, tf in postings:
+            norm = 1 - BM25_B + BM25_B * doc_lens[doc_id] / avg_doc_len
+            rows.append(doc_id)
+            cols.append(col)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm))
+
+    DOC_TERM = csr_matrix(
+        (np.asarray(weights), (np.asarray(rows), np.asarray(cols))),
+        shape=(n_docs, len(VOCAB)),
+    )
+
+_build_index()
+
 # --- MODELS ---
 class ChatRequest(BaseModel):
     session_id: str
@@ -41,53 +203,172 @@ class ChatResponse(BaseModel):
     response: str
     state: str  # e.g., "collecting_name", "completed", etc.
 
+# --- EXACT-MATCH CACHE (first tier, checked before embedding) ---
+EXACT_CACHE_SIZE = 1024
+_EXACT: "OrderedDict[tuple, str]" = OrderedDict()  # LRU: oldest entry first
+
+def _exact_key(context: str, user_query: str) -> tuple:
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()[:16], user_query
+
+def _exact_get(key: tuple) -> Optional[str]:
+    answer = _EXACT.get(key)
+    if answer is not None:
+        _EXACT.move_to_end(key)
+    return answer
+
+def _exact_put(key: tuple, answer: str):
+    _EXACT[key] = answer
+    _EXACT.move_to_end(key)
+    if len(_EXACT) > EXACT_CACHE_SIZE:
+        _EXACT.popitem(last=False)
+
+# --- SEMANTIC CACHE [optional: faiss + sentence-transformers] ---
+SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.9  # Min cosine similarity to reuse an answer
+SEMANTIC_CACHE_INDEX_FILE = "semantic_cache.index"
+SEMANTIC_CACHE_DATA_FILE = "semantic_cache.json"
+SEMANTIC_CACHE_SAVE_EVERY = 20  # Persist after this many new entries
+
+class SemanticCache:
+    """
+    Embedding-similarity cache in front of the LLM.
+    Questions are embedded locally and compared (cosine) against past
+    questions in a FAISS index; near-duplicates reuse the stored answer.
+    """
+
+    def __init__(self):
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self._faiss = faiss
+        self.model = SentenceTransformer(SEMANTIC_CACHE_MODEL)
+        self.responses: List[str] = []
+        self.unsaved = 0
+
+        dim = self.model.get_sentence_embedding_dimension()
+        self.index = faiss.IndexFlatIP(dim)
+        if os.path.exists(SEMANTIC_CACHE_INDEX_FILE) and os.path.exists(SEMANTIC_CACHE_DATA_FILE):
+            index = faiss.read_index(SEMANTIC_CACHE_INDEX_FILE)
+            with open(SEMANTIC_CACHE_DATA_FILE, "rb") as f:
+                responses = orjson.loads(f.read())
+            # Ignore a stale/partial snapshot rather than serve mismatched answers
+            if index.d == dim and index.ntotal == len(responses):
+                self.index, self.responses = index, responses
+
+    def embed(self, text: str):
+        # Normalized vectors make inner product == cosine similarity
+        return self.model.encode([text], normalize_embeddings=True).astype("float32")
+
+    def lookup(self, vector) -> Optional[str]:
+        if self.index.ntotal == 0:
+            return None
+        scores, ids = self.index.search(vector, 1)
+        if scores[0][0] >= SEMANTIC_CACHE_THRESHOLD:
+            return self.responses[ids[0][0]]
+        return None
+
+    async def add(self, vector, response: str):
+        self.index.add(vector)
+        self.responses.append(response)
+        self.unsaved += 1
+        if self.unsaved >= SEMANTIC_CACHE_SAVE_EVERY:
+            await self.save()
+
+    async def save(self):
+        # Snapshot in memory on the loop thread (so concurrent adds can't race
+        # the writer), then do the disk writes off the event loop
+        index_bytes = self._faiss.serialize_index(self.index).tobytes()
+        responses_bytes = orjson.dumps(self.responses)
+        self.unsaved = 0
+        await asyncio.to_thread(self._write, index_bytes, responses_bytes)
+
+    @staticmethod
+    def _write(index_bytes: bytes, responses_bytes: bytes):
+        with open(SEMANTIC_CACHE_INDEX_FILE, "wb") as f:
+            f.write(index_bytes)
+        with open(SEMANTIC_CACHE_DATA_FILE, "wb") as f:
+            f.write(responses_bytes)
+
+# Only worth loading the embedding model when there is an LLM to save calls on.
+# Any failure (missing packages, no network for the model download, a corrupt
+# snapshot) just leaves the cache off; the assistant must still start offline.
+SEMANTIC_CACHE: Optional[SemanticCache] = None
+if CLIENT is not None:
+    try:
+        SEMANTIC_CACHE = SemanticCache()
+    except Exception as e:
+        print(f"WARNING: Semantic cache disabled: {e}")
+
 # --- HELPER FUNCTIONS ---
 
 def find_best_match(query: str) -> str:
     """
     OFFLINE FALLBACK & GROUNDING [cite: 20]
-    Simple keyword search against knowledge.json. 
+    BM25 keyword search against the prebuilt index of knowledge.json.
     Returns the most relevant text chunk.
+    Pure in-memory CPU work, so it stays synchronous.
     """
-    query_words = set(query.lower().split())
-    best_score = 0
-    best_content = ""
+    # Strips punctuation too, so "taxes?" matches "taxes"
+    tokens = frozenset(_tokenize(query))
+    # Keep the raw terms if the question is nothing but stop words
+    query_words = (tokens - _STOP) or tokens
 
-    # Handle both single object and array formats
-    items = KNOWLEDGE_BASE if isinstance(KNOWLEDGE_BASE, list) else [KNOWLEDGE_BASE]
+    query_cols = [VOCAB[word] for word in query_words if word in VOCAB]
+    if not query_cols:
+        return None
 
-    for item in items:
-        content = item.get("content", "")
-        # Count overlapping words (Jaccard-ish)
-        score = sum(1 for word in query_words if word in content.lower())
-        
-        if score > best_score:
-            best_score = score
-            best_content = content
+    # Score every chunk at once: row-sums of the query terms' columns
+    query_vec = np.zeros(len(VOCAB))
+    query_vec[query_cols] = 1
+    scores = DOC_TERM @ query_vec
+
+    # Only the winning chunk's text is touched
+    best_doc = int(np.argmax(scores))
 
     # Threshold to prevent hallucinations on irrelevant data
-    if best_score < 1: 
+    if scores[best_doc] <= 0:
         return None
     
-    # Return a truncated chunk (Simplicity)
-    return best_content[:1000] 
+    # Chunks are already bounded by CHUNK_SIZE
+    return DOC_CONTENTS[best_doc]
 
-def query_llm(context: str, user_query: str) -> str:
+async def stream_llm(context: str, user_query: str):
     """
     LLM WRAPPER [cite: 18, 19]
     1. Uses context from scraping.
-    2. Handles offline errors gracefully.
+    2. Serves repeated questions from the exact-match cache, then
+       near-duplicates from the semantic cache.
+    3. Yields the answer token-by-token as the model produces it.
+    4. Handles offline errors gracefully.
     """
     # 1. Check for API Key (or Mock it)
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return f"I'm in offline mode. Based on my internal data: {context[:300]}..."
+    if CLIENT is None:
+        yield f"I'm in offline mode. Based on my internal data: {context[:300]}..."
+        return
 
+    # 2a. Exact-match cache: same question against the same context
+    exact_key = _exact_key(context, user_query)
+    cached = _exact_get(exact_key)
+    if cached is not None:
+        yield cached
+        return
+
+    # 2b. Semantic cache (embedding is CPU-bound, keep it off the event loop)
+    # Any cache failure is treated as a miss; the LLM path still answers
+    query_vector, cached = None, None
+    if SEMANTIC_CACHE is not None:
+        try:
+            query_vector = await asyncio.to_thread(SEMANTIC_CACHE.embed, user_query)
+            cached = SEMANTIC_CACHE.lookup(query_vector)
+        except Exception as e:
+            print(f"WARNING: Semantic cache lookup failed: {e}")
+        if cached is not None:
+            _exact_put(exact_key, cached)
+            yield cached
+            return
+
+    parts: List[str] = []
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        
         system_prompt = (
             "You are an assistant for Occams Advisory. "
             "Answer the question strictly based on the provided context. "
@@ -96,109 +377,193 @@ def query_llm(context: str, user_query: str) -> str:
             "Answer in 3 to 4 lines."
         )
         
-        response = client.chat.completions.create(
+        response = await CLIENT.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Context: {context}\n\nQuestion: {user_query}"}
             ],
-            timeout=5  # Fail fast for offline demo
+            stream=True
         )
-        return response.choices[0].message.content
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
         
     except Exception as e:
         print(f"LLM Error: {e}")
         # Graceful degradation [cite: 20]
-        return f"(Network unavailable) Here is what I found in my records: {context[:400]}..."
+        separator = "\n\n" if parts else ""
+        yield f"{separator}(Network unavailable) Here is what I found in my records: {context[:400]}..."
+        return
+
+    # Only complete, non-empty answers are worth caching
+    answer = "".join(parts)
+    if not answer:
+        return
+    _exact_put(exact_key, answer)
+    if query_vector is not None:
+        # add() may also persist to disk; a full/read-only disk must not
+        # cost the user an answer they already received
+        try:
+            await SEMANTIC_CACHE.add(query_vector, answer)
+        except Exception as e:
+            print(f"WARNING: Semantic cache update failed: {e}")
+
+async def query_llm(context: str, user_query: str) -> str:
+    """Buffered variant of stream_llm for callers that need the whole answer."""
+    return "".join([part async for part in stream_llm(context, user_query)])
 
 # --- ONBOARDING LOGIC [cite: 6, 8] ---
 
-def handle_onboarding(session_id: str, message: str):
-    session = sessions[session_id]
-    step = session["step"]
-    
-    # Regex Patterns
-    email_pattern = r"[^@]+@[^@]+\.[^@]+"
-    phone_pattern = r"\d{10,}" # Simple 10+ digit check
-
-    if step == "init":
-        session["step"] = "collecting_name"
-        return "Welcome to Occams Advisory! To get started, may I have your name?"
-
-    if step == "collecting_name":
-        # Assume input is name (Simplification for MVP)
-        session["data"]["name"] = message
-        session["step"] = "collecting_email"
-        return f"Nice to meet you, {message}. What is your email address?"
-
-    if step == "collecting_email":
-        if re.search(email_pattern, message):
-            session["data"]["email"] = message
-            session["step"] = "collecting_phone"
-            return "Got it. Finally, what is a good phone number to reach you?"
-        else:
-            # Nudge user [cite: 34]
-            return "That doesn't look like a valid email. Could you please try again?"
-
-    if step == "collecting_phone":
-        if re.search(phone_pattern, message):
-            session["data"]["phone"] = message
-            session["step"] = "completed"
-            return "All set! You're fully onboarded. Feel free to ask me anything about our services."
-        else:
-            return "Please enter a valid phone number (digits only)."
+# Validation Patterns (compiled once at import)
+EMAIL_RE = re.compile(r"\b[^@\s]+@[^@\s]+\.[^@\s]+\b")
+PHONE_MIN_DIGITS = 10
+
+# Each handler takes (session, message), records any captured data and
+# returns (next_step, reply)
+
+def _h_init(session: Dict, message: str):
+    return "collecting_name", "Welcome to Occams Advisory! To get started, may I have your name?"
+
+def _h_name(session: Dict, message: str):
+    # Assume input is name (Simplification for MVP)
+    session["data"]["name"] = message
+    return "collecting_email", f"Nice to meet you, {message}. What is your email address?"
+
+def _h_email(session: Dict, message: str):
+    if EMAIL_RE.search(message):
+        session["data"]["email"] = message
+        return "collecting_phone", "Got it. Finally, what is a good phone number to reach you?"
+    # Nudge user [cite: 34]
+    return "collecting_email", "That doesn't look like a valid email. Could you please try again?"
+
+def _h_phone(session: Dict, message: str):
+    # Simple 10+ digit check (ASCII only: str.isdigit also accepts e.g. "²")
+    digits = message.strip()
+    if len(digits) >= PHONE_MIN_DIGITS and digits.isascii() and digits.isdigit():
+        session["data"]["phone"] = digits
+        return "completed", "All set! You're fully onboarded. Feel free to ask me anything about our services."
+    return "collecting_phone", "Please enter a valid phone number (digits only)."
+
+# Onboarding state machine: step -> handler
+_HANDLERS = {
+    "init": _h_init,
+    "collecting_name": _h_name,
+    "collecting_email": _h_email,
+    "collecting_phone": _h_phone,
+}
+
+# Reminder appended to RAG answers while a step is still pending [cite: 34]
+_NUDGE = {
+    step: f"\n\n(By the way, I still need your {missing} to finish your setup!)"
+    for step, missing in (
+        ("collecting_name", "name"),
+        ("collecting_email", "email"),
+        ("collecting_phone", "phone"),
+    )
+}
+
+def handle_onboarding(session: Dict, message: str):
+    """Advances the onboarding state machine in place; the caller persists the session."""
+    handler = _HANDLERS.get(session["step"])
+    if handler is None:
+        return None
 
-    return None
+    session["step"], reply = handler(session, message)
+    return reply
 
 # --- API ENDPOINTS ---
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    sid = request.session_id
-    msg = request.message.strip()
+NO_MATCH_REPLY = "I'm sorry, I couldn't find information about that on our website."
 
+async def start_turn(sid: str, msg: str):
+    """
+    Runs the onboarding side of a chat turn.
+    Returns (reply, state); reply is None when the message should go to RAG.
+    """
     # Create session if not exists
-    if sid not in sessions:
-        sessions[sid] = {"step": "init", "data": {}, "history": []}
-        greeting = handle_onboarding(sid, "")
+    session = await sessions.get(sid)
+    if session is None:
+        session = {"step": "init", "data": {}, "history": []}
         # Trigger first greeting
-        return ChatResponse(response=greeting, state=sessions[sid]["step"])
-        # return ChatResponse(response=handle_onboarding(sid, ""), state="init")
+        greeting = handle_onboarding(session, "")
+        await sessions.save(sid, session)
+        return greeting, session["step"]
 
     # 1. INTERCEPT: Is this an answer to an onboarding question?
-    current_step = sessions[sid]["step"]
+    current_step = session["step"]
     
     # Simple heuristic: If we are not complete, treat input as potential onboarding data
     # UNLESS the user asks a question (contains "?")
     is_question = "?" in msg
     
     if current_step != "completed" and not is_question:
-        response = handle_onboarding(sid, msg)
+        response = handle_onboarding(session, msg)
         if response:
-             return ChatResponse(response=response, state=sessions[sid]["step"])
+            await sessions.save(sid, session)
+            return response, session["step"]
+
+    return None, current_step
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    msg = request.message.strip()
+    reply, state = await start_turn(request.session_id, msg)
+    if reply is not None:
+        return ChatResponse(response=reply, state=state)
 
     # 2. RAG LOGIC: User asked a question or ignored the nudge
     context = find_best_match(msg)
     
     if context:
-        answer = query_llm(context, msg)
+        answer = await query_llm(context, msg)
     else:
-        answer = "I'm sorry, I couldn't find information about that on our website."
+        answer = NO_MATCH_REPLY
 
     # 3. NUDGE: If not onboarded, append a reminder [cite: 34]
-    if current_step != "completed":
-        # Identify what is missing
-        missing = "name" if current_step == "collecting_name" else \
-                  "email" if current_step == "collecting_email" else "phone"
-        
-        answer += f"\n\n(By the way, I still need your {missing} to finish your setup!)"
+    answer += _NUDGE.get(state, "")
+
+    return ChatResponse(response=answer, state=state)
+
+def _sse(payload: Dict) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same flow as /chat, streamed as Server-Sent Events.
+    Events are {"delta": "..."} text pieces, then a final {"done": true, "state": "..."}.
+    """
+    msg = request.message.strip()
+    reply, state = await start_turn(request.session_id, msg)
+
+    async def events():
+        if reply is not None:
+            yield _sse({"delta": reply})
+        else:
+            # 2. RAG LOGIC: forward tokens as soon as the LLM produces them
+            context = find_best_match(msg)
+            if context:
+                async for part in stream_llm(context, msg):
+                    yield _sse({"delta": part})
+            else:
+                yield _sse({"delta": NO_MATCH_REPLY})
+
+            # 3. NUDGE: sent as its own final text event [cite: 34]
+            nudge = _NUDGE.get(state)
+            if nudge:
+                yield _sse({"delta": nudge})
+
+        yield _sse({"done": True, "state": state})
 
-    return ChatResponse(response=answer, state=current_step)
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 @app.get("/debug/{session_id}")
 async def get_state(session_id: str):
     """Helper to view captured state without logging it to console."""
-    return sessions.get(session_id, {})
+    return await sessions.get(session_id) or {}
 
 if __name__ == "__main__":
     import uvicorn
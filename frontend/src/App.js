@@ -45,14 +45,44 @@ function App() {
     setIsLoading(true);
 
     try {
-      const res = await fetch('http://localhost:8000/chat', {
+      const res = await fetch('http://localhost:8000/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ session_id: sessionId, message: userMsg })
       });
-      
-      const data = await res.json();
-      setMessages(prev => [...prev, { role: 'bot', text: data.response }]);
+      // Error responses are JSON, not an event stream
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+      // Read Server-Sent Events and grow the bot bubble as tokens arrive
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n'); // Events end with a blank line
+        buffer = events.pop();
+
+        for (const event of events) {
+          if (!event.startsWith('data: ')) continue;
+          const { delta } = JSON.parse(event.slice('data: '.length));
+          if (delta === undefined) continue;
+
+          if (!started) {
+            started = true;
+            setMessages(prev => [...prev, { role: 'bot', text: delta }]);
+          } else {
+            setMessages(prev => {
+              const last = prev[prev.length - 1];
+              return [...prev.slice(0, -1), { ...last, text: last.text + delta }];
+            });
+          }
+        }
+      }
     } catch (error) {
       setMessages(prev => [...prev, { role: 'bot', text: "Network error. Please try again." }]);
     } finally {
@@ -77,7 +107,10 @@ function App() {
             </div>
           </div>
         ))}
-        {isLoading && <div className="message bot"><div className="bubble">Thinking...</div></div>}
+        {/* Only until the first streamed token shows up */}
+        {isLoading && messages[messages.length - 1]?.role === 'user' && (
+          <div className="message bot"><div className="bubble">Thinking...</div></div>
+        )}
         <div ref={messagesEndRef} />
       </div>
 